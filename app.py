@@ -1,7 +1,38 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
+import altair as alt
 import io
+import codecs
+import gzip
+import hashlib
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Optional accelerators: multithreaded PyArrow CSV reading/writing and one-shot encoding sniffing
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
+
+# Optional: Polars runs the Final Report's aggregations multi-threaded over Arrow buffers
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# Copy-on-write lets raw and working frames share memory until a cleaning step actually changes data
+pd.set_option("mode.copy_on_write", True)
 
 # =====================================================
 # PAGE CONFIGURATION
@@ -78,10 +109,337 @@ st.markdown("""
 # =====================================================
 # HELPER FUNCTIONS (Cached for Performance)
 # =====================================================
+CHART_TYPES = ["Histogram", "Bar", "Pie", "Line", "Scatter", "Boxplot"]
+PREVIEW_POINTS = 2_000  # Line/Scatter points shipped to the browser per chart
+HIST_SAMPLE = 50_000  # Values binned on the server; only the 20 bars reach the browser
+PREVIEW_ROWS = 1_000
+CSV_GZIP_ROWS = 1_000_000
+CACHE_DIR = Path(__file__).parent / ".cache"
+CACHE_MAX_FILES = 20
+CACHE_MAX_AGE_S = 7 * 24 * 3600
+NON_WESTERN_SCRIPTS = ("Cyrillic", "Greek", "Arabic", "Hebrew", "Thai", "CJK", "Hiragana", "Katakana", "Hangul", "Devanagari")
+
+def _encode_csv(write, compress):
+    """Runs a CSV writer against an in-memory buffer, optionally through gzip."""
+    buffer = io.BytesIO()
+    if compress:
+        with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6) as out:
+            write(out)
+    else:
+        write(buffer)
+    return buffer.getvalue()
+
+def _has_temporal_columns(df) -> bool:
+    """True if any column (or categorical's categories) holds datetimes or timedeltas."""
+    for dtype in df.dtypes:
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtype = dtype.categories.dtype
+        if dtype.kind in "mM":
+            return True
+    return False
+
 @st.cache_data
 def convert_df_to_csv(df):
-    """Caches the converted CSV so we don't re-compute on every click."""
-    return df.to_csv(index=False).encode('utf-8')
+    """Caches the converted CSV so we don't re-compute on every click; big frames come back gzipped."""
+    compress = len(df) > CSV_GZIP_ROWS
+    # Arrow writes datetimes with nanosecond padding and timedeltas as raw integers, so
+    # those frames go through pandas. Otherwise Arrow's output differs from to_csv only in
+    # quoting every header and string field, writing true/false, and dropping ".0" (1.0 -> 1)
+    if HAS_PYARROW and not _has_temporal_columns(df):
+        try:
+            return _encode_csv(lambda out: pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), out), compress)
+        except (pa.ArrowException, TypeError, ValueError):
+            pass  # Column types Arrow can't serialize fall back to pandas below
+    return _encode_csv(lambda out: df.to_csv(out, index=False, encoding="utf-8"), compress)
+
+def _is_non_western(match) -> bool:
+    """True when charset_normalizer decoded the sample into a non-Latin script (Cyrillic, CJK, ...)."""
+    return any(a.startswith(NON_WESTERN_SCRIPTS) for a in match.alphabets)
+
+def _sniff_encoding(head: bytes) -> str:
+    """Guesses the file encoding from its first bytes so the CSV is only read once."""
+    try:
+        # Incremental decode tolerates a multi-byte character cut off at the end of the sample
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        head.decode("cp1252")
+        western = "cp1252"
+    except UnicodeDecodeError:
+        western = "latin1"
+    if charset_normalizer is None:
+        return western
+    best = charset_normalizer.from_bytes(head).best()
+    if best is None or not _is_non_western(best):
+        # Western guesses (cp1250, ...) are unreliable on short samples and would misread é/ñ
+        return western
+    if western == "cp1252" and (best.chaos > 0.1 or best.coherence < 0.3):
+        # cp1252 reads the sample fine; only switch for a confident non-Western match
+        return western
+    return best.encoding
+
+def _shrink_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcasts integers and turns repetitive text columns into categories to cut memory."""
+    if len(df) < 10_000:
+        return df
+    # Floats stay float64: downcasting to float32 would silently round the user's values
+    for c in df.select_dtypes(include="integer").columns:
+        df[c] = pd.to_numeric(df[c], downcast="integer")
+    for c in df.select_dtypes(include="object").columns:
+        if df[c].nunique() / len(df) < 0.5:
+            df[c] = df[c].astype("category")
+    return df
+
+def _has_undecoded_bytes(df) -> bool:
+    """True if Arrow fell back to binary columns, i.e. bytes past the sniffed sample didn't decode."""
+    if any(isinstance(c, bytes) for c in df.columns):
+        return True
+    for i, dtype in enumerate(df.dtypes):
+        if dtype != object:
+            continue
+        # Arrow types a whole column as binary, so the first value is enough to tell
+        values = df.iloc[:, i].dropna()
+        if len(values) and isinstance(values.iloc[0], bytes):
+            return True
+    return False
+
+def _parse_upload(file_bytes: bytes, name: str) -> pd.DataFrame:
+    """Reads CSV/Excel bytes into a DataFrame, preferring the fastest available CSV engine."""
+    buffer = io.BytesIO(file_bytes)
+    if name.endswith(".csv"):
+        encoding = _sniff_encoding(file_bytes[:65536])
+        if HAS_PYARROW:
+            try:
+                parsed = pd.read_csv(buffer, engine="pyarrow", encoding=encoding)
+                if not _has_undecoded_bytes(parsed):
+                    return parsed
+            except Exception:
+                pass
+            buffer.seek(0)
+        try:
+            return pd.read_csv(buffer, engine="c", encoding=encoding, low_memory=False, cache_dates=True)
+        except UnicodeDecodeError:
+            buffer.seek(0)
+            return pd.read_csv(buffer, engine="c", encoding="latin1", low_memory=False, cache_dates=True)
+    with pd.ExcelFile(buffer) as xls:
+        return xls.parse(xls.sheet_names[0])
+
+# Bounded: every cached upload stays pickled in server memory, shared by all sessions
+@st.cache_data(show_spinner=False, max_entries=8, ttl=3600)
+def _load_df(file_bytes: bytes, name: str) -> pd.DataFrame:
+    """Parses an upload once per unique file; reopening the same file is a cache hit."""
+    return _shrink_dtypes(_parse_upload(file_bytes, name))
+
+def _cleaned_path(file_key):
+    return CACHE_DIR / f"{file_key}.parquet"
+
+@st.cache_resource
+def _cache_writer():
+    """One background writer shared across reruns, so Parquet saves land in click order without blocking it."""
+    return ThreadPoolExecutor(max_workers=1)
+
+def _prune_cache():
+    """Keeps the Parquet cache bounded: drops week-old files, then all but the newest few."""
+    files = sorted(CACHE_DIR.glob("*.parquet"), key=lambda p: p.stat().st_mtime, reverse=True)
+    cutoff = time.time() - CACHE_MAX_AGE_S
+    for i, path in enumerate(files):
+        if i >= CACHE_MAX_FILES or path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+def _write_cleaned(df, file_key):
+    tmp_path = CACHE_DIR / f"{file_key}.parquet.tmp"
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        # Write then rename, so a restore never reads a half-written file
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, _cleaned_path(file_key))
+        _prune_cache()
+    except Exception:
+        tmp_path.unlink(missing_ok=True)  # Best effort: the session still holds the data
+
+def _persist_cleaned(df, file_key):
+    """Saves the cleaned frame in the background so a later upload of the same file can offer to restore it."""
+    if file_key is not None:
+        _cache_writer().submit(_write_cleaned, df, file_key)
+
+def _forget_cleaned(file_key):
+    """Deletes the saved cleaning for this upload, after any save still queued for it."""
+    if file_key is not None:
+        _cache_writer().submit(_cleaned_path(file_key).unlink, missing_ok=True)
+
+def _restore_cleaned(file_key):
+    """Returns the persisted cleaned frame for this upload, or None if there isn't a usable one."""
+    path = _cleaned_path(file_key)
+    if not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return None
+
+def _dup_count(df) -> int:
+    """Counts duplicate rows; all-numeric frames hash each row to one uint64 and check those for repeats.
+
+    Object and categorical columns go through df.duplicated(): row hashing stringifies mixed values,
+    so 1 and "1" would collide. The hash path can in principle also collide on 64 bits (odds ~n²/2⁶⁵).
+    """
+    if df.shape[1] == 0 or any(dt.kind not in "biufmM" for dt in df.dtypes):
+        return int(df.duplicated().sum())
+    frame = df
+    float_positions = [i for i, dt in enumerate(df.dtypes) if dt.kind == "f"]
+    if float_positions:
+        # duplicated() treats both zeros as equal and every NaN as equal, but hashing reads the raw bits:
+        # -0.0 + 0.0 is 0.0, and rewriting missing slots as np.nan drops -nan and other NaN payloads
+        frame = df.copy()
+        for i in float_positions:
+            col = df.iloc[:, i]
+            frame.isetitem(i, (col + 0.0).where(col.notna(), np.nan))
+    return int(pd.util.hash_pandas_object(frame, index=False).duplicated().sum())
+
+# These caches are process-wide, so they key on the session's data_version token rather than the
+# frame: the frame itself is passed unhashed (leading underscore), and a new version replaces clearing
+@st.cache_data(show_spinner=False, max_entries=64)
+def _kpis(_df, version) -> dict:
+    """Duplicate and missing-value counts for the KPI cards, computed once per data version."""
+    return {"dup": _dup_count(_df), "nulls": int(_df.isnull().sum().sum())}
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _schema(_df, version) -> dict:
+    """Numeric and full column lists, resolved once per data version instead of on every page."""
+    return {"numeric": list(_df.select_dtypes(include=["number"]).columns), "all": list(_df.columns)}
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _value_counts(_df, version, column) -> pd.Series:
+    """Per-column value counts shared by every Bar/Pie chart on the same data version."""
+    return _df[column].value_counts()
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _to_polars(_df, version):
+    """Polars copy of the working frame, shared across reruns as a resource rather than unpickled each time."""
+    # Polars needs string column names to address columns by the same labels pandas uses
+    if pl is None or not all(isinstance(c, str) for c in _df.columns):
+        return None
+    try:
+        return pl.from_pandas(_df)
+    except Exception:
+        return None  # e.g. mixed-type object columns Arrow can't convert
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _report_stats(_df, version, numeric_cols) -> dict:
+    """KPI counts and the numeric summary for the Final Report, computed in Polars when it can take the frame."""
+    pldf = _to_polars(_df, version)
+    if pldf is None:
+        stats = dict(_kpis(_df, version))
+        stats["summary"] = _df[numeric_cols].agg(['mean', 'min', 'max', 'std']).T.round(2) if numeric_cols else None
+        return stats
+
+    summary = None
+    if numeric_cols:
+        num = pldf.select(numeric_cols)
+        summary = pd.DataFrame({
+            "mean": num.mean().row(0),
+            "min": num.min().row(0),
+            "max": num.max().row(0),
+            "std": num.std().row(0),
+        }, index=numeric_cols).round(2)
+    return {
+        "dup": pldf.height - pldf.n_unique(),
+        "nulls": int(pldf.null_count().sum_horizontal()[0]),
+        "summary": summary,
+    }
+
+def _prep(series, n, ordered=False):
+    """Drops NaNs and thins a column to at most n points; a chart-sized preview looks the same."""
+    s = series.dropna()
+    if len(s) <= n:
+        return s
+    if ordered:
+        # Evenly spaced rows keep the shape of Line/Scatter plots over the index
+        return s.iloc[np.linspace(0, len(s) - 1, n).astype(int)]
+    return s.sample(n, random_state=0)
+
+def _build_chart(df, version, chart, column, numeric_cols, color, height):
+    """Builds a client-rendered Altair spec for one visual; None if the column can't back that chart."""
+    if chart in ("Bar", "Pie"):
+        vc = _value_counts(df, version, column).head(8 if chart == "Bar" else 5)
+        data = pd.DataFrame({"label": vc.index.astype(str), "count": vc.values})
+        if chart == "Bar":
+            spec = alt.Chart(data).mark_bar(color=color).encode(
+                x=alt.X("label:N", sort="-y", title=None, axis=alt.Axis(labelAngle=-45)),
+                y=alt.Y("count:Q", title=None),
+                tooltip=["label", "count"],
+            )
+        else:
+            spec = alt.Chart(data).mark_arc().encode(
+                theta="count:Q",
+                color=alt.Color("label:N", title=None),
+                tooltip=["label", "count"],
+            )
+        return spec.properties(height=height)
+
+    if column not in numeric_cols:
+        return None
+
+    if chart == "Histogram":
+        # Bin on the server so only 20 bars travel to the browser, not the whole column
+        counts, edges = np.histogram(_prep(df[column], HIST_SAMPLE), bins=20)
+        data = pd.DataFrame({"start": edges[:-1], "end": edges[1:], "count": counts})
+        spec = alt.Chart(data).mark_bar(color=color).encode(
+            x=alt.X("start:Q", title=None), x2="end:Q", y=alt.Y("count:Q", title=None)
+        )
+    elif chart in ("Line", "Scatter"):
+        series = _prep(df[column], PREVIEW_POINTS, ordered=True)
+        data = pd.DataFrame({"index": series.index, "value": series.values})
+        mark = alt.Chart(data).mark_line(color=color) if chart == "Line" else alt.Chart(data).mark_circle(color=color, opacity=0.5)
+        spec = mark.encode(x=alt.X("index:Q", title=None), y=alt.Y("value:Q", title=None))
+    elif chart == "Boxplot":
+        q = df[column].dropna().quantile([0, 0.25, 0.5, 0.75, 1]).to_numpy()
+        base = alt.Chart(pd.DataFrame({"min": [q[0]], "q1": [q[1]], "median": [q[2]], "q3": [q[3]], "max": [q[4]]}))
+        spec = alt.layer(
+            base.mark_rule().encode(x=alt.X("min:Q", title=None), x2="max:Q"),
+            base.mark_bar(color=color, size=20).encode(x="q1:Q", x2="q3:Q"),
+            base.mark_tick(color="white", size=20, thickness=2).encode(x="median:Q"),
+        )
+    else:
+        return None
+    return spec.properties(height=height)
+
+@st.fragment
+def _visual_row(i, df, version, all_cols, numeric_cols):
+    """One Visual Builder row; its chart only renders when Preview is pressed, and then only this row reruns."""
+    saved = st.session_state.visual_config[i]
+    chart_index = CHART_TYPES.index(saved[0]) if saved else 0
+    column_index = all_cols.index(saved[1]) if saved and saved[1] in all_cols else 0
+
+    # The form holds selectbox edits client-side until Preview, so picking options triggers no reruns
+    with st.form(f"v{i}", border=False):
+        col1, col2, col3 = st.columns([1, 1, 2])
+        
+        with col1:
+            chart = st.selectbox("Chart Type", CHART_TYPES, index=chart_index, key=f"type_{i}")
+        with col2:
+            column = st.selectbox("Target Column", all_cols, index=column_index, key=f"col_{i}")
+            submitted = st.form_submit_button("Preview", use_container_width=True)
+        
+        if submitted:
+            st.session_state.visual_config[i] = (chart, column)
+
+            with col3:
+                try:
+                    spec = _build_chart(df, version, chart, column, numeric_cols, '#0284c7', 150)
+                    if spec is None:
+                        st.write("⚠️ *Select a numeric column for this chart type.*")
+                    else:
+                        st.altair_chart(spec, use_container_width=True)
+                except Exception:
+                    st.error("Cannot render preview.")
+    st.divider()
+
+def _new_data_version():
+    """Tags the session's working frame with a fresh token; unique across sessions, unlike a counter."""
+    st.session_state.data_version = uuid.uuid4().hex
 
 # =====================================================
 # STATE MANAGEMENT
@@ -94,6 +452,50 @@ if "current_file" not in st.session_state:
     st.session_state.current_file = None
 if "visual_config" not in st.session_state:
     st.session_state.visual_config = []
+if "file_key" not in st.session_state:
+    st.session_state.file_key = None
+if "restore_offer" not in st.session_state:
+    st.session_state.restore_offer = False
+if "data_version" not in st.session_state:
+    _new_data_version()
+
+# =====================================================
+# CLEANING ACTIONS (Button callbacks)
+# =====================================================
+# Callbacks run before the script reruns, so a click costs one pass and the KPIs see the new data
+def _drop_duplicates():
+    st.session_state.df = st.session_state.df.drop_duplicates()
+    st.session_state.restore_offer = False
+    _persist_cleaned(st.session_state.df, st.session_state.file_key)
+    _new_data_version()
+
+def _apply_fill(numeric_cols):
+    df = st.session_state.df
+    fill_strat = st.session_state.fill_strat
+    if fill_strat in ("Mean", "Median"):
+        fill_values = df[numeric_cols].agg(fill_strat.lower()).to_dict()
+    elif fill_strat == "Zero":
+        fill_values = dict.fromkeys(numeric_cols, 0)
+    else:
+        return
+    # One column-to-value dict, applied in a single fillna pass over the frame
+    st.session_state.df = df.fillna(fill_values)
+    st.session_state.restore_offer = False
+    _persist_cleaned(st.session_state.df, st.session_state.file_key)
+    _new_data_version()
+
+def _reset_data():
+    st.session_state.df = st.session_state.raw_df
+    st.session_state.restore_offer = False
+    _forget_cleaned(st.session_state.file_key)
+    _new_data_version()
+
+def _restore_previous():
+    restored_df = _restore_cleaned(st.session_state.file_key)
+    if restored_df is not None:
+        st.session_state.df = restored_df
+        _new_data_version()
+    st.session_state.restore_offer = False
 
 # =====================================================
 # HERO SECTION
@@ -119,26 +521,25 @@ uploaded_file = st.sidebar.file_uploader("Upload CSV or Excel", type=["csv","xls
 if uploaded_file:
     if st.session_state.current_file != uploaded_file.name:
         try:
-            if uploaded_file.name.endswith(".csv"):
-                try:
-                    temp_df = pd.read_csv(uploaded_file, encoding="utf-8")
-                except UnicodeDecodeError:
-                    uploaded_file.seek(0)
-                    temp_df = pd.read_csv(uploaded_file, encoding="latin1")
-            else:
-                temp_df = pd.read_excel(uploaded_file)
+            file_bytes = uploaded_file.getvalue()
+            temp_df = _load_df(file_bytes, uploaded_file.name)
+            file_key = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
             
-            # Save both raw (for resets) and working copy
-            st.session_state.raw_df = temp_df.copy()
-            st.session_state.df = temp_df.copy()
+            # Raw (for resets) and working frame share one copy; cleaning steps return new frames
+            st.session_state.raw_df = temp_df
+            st.session_state.df = temp_df
+            st.session_state.file_key = file_key
+            st.session_state.restore_offer = _cleaned_path(file_key).exists()
             st.session_state.current_file = uploaded_file.name
             st.session_state.visual_config = [] # Reset visuals on new file
+            _new_data_version()
             st.sidebar.success("File loaded successfully!")
         except Exception as e:
             st.sidebar.error(f"Error reading file: {e}")
 
 # Local reference for convenience
 df = st.session_state.df
+version = st.session_state.data_version
 
 # =====================================================
 # PAGE 1: UPLOAD & CLEAN
@@ -148,13 +549,16 @@ if page == "1. Upload & Clean":
 
     if df is not None:
         
+        schema = _schema(df, version)
+
         # --- RESTORED KPI CARDS FOR LIVE CLEANING FEEDBACK ---
         st.subheader("Dataset Overview")
+        stats = _kpis(df, version)
         c1, c2, c3, c4 = st.columns(4)
         c1.markdown(f"<div class='kpi-card'><h2>{df.shape[0]:,}</h2><p>Total Rows</p></div>", unsafe_allow_html=True)
         c2.markdown(f"<div class='kpi-card'><h2>{df.shape[1]:,}</h2><p>Total Columns</p></div>", unsafe_allow_html=True)
-        c3.markdown(f"<div class='kpi-card'><h2>{df.duplicated().sum():,}</h2><p>Duplicate Rows</p></div>", unsafe_allow_html=True)
-        c4.markdown(f"<div class='kpi-card'><h2>{df.isnull().sum().sum():,}</h2><p>Missing Values</p></div>", unsafe_allow_html=True)
+        c3.markdown(f"<div class='kpi-card'><h2>{stats['dup']:,}</h2><p>Duplicate Rows</p></div>", unsafe_allow_html=True)
+        c4.markdown(f"<div class='kpi-card'><h2>{stats['nulls']:,}</h2><p>Missing Values</p></div>", unsafe_allow_html=True)
         
         st.markdown("<br><hr><br>", unsafe_allow_html=True)
 
@@ -163,38 +567,36 @@ if page == "1. Upload & Clean":
         with col_tools:
             st.subheader("Data Cleaning")
             
-            if st.button("Drop Duplicate Rows", use_container_width=True):
-                st.session_state.df = df.drop_duplicates()
-                st.rerun()
+            st.button("Drop Duplicate Rows", use_container_width=True, on_click=_drop_duplicates)
 
-            numeric_cols = df.select_dtypes(include=["number"]).columns
-            fill_strat = st.selectbox("Fill missing numeric values with:", ["Select Strategy", "Mean", "Median", "Zero"])
+            numeric_cols = schema["numeric"]
+            st.selectbox("Fill missing numeric values with:", ["Select Strategy", "Mean", "Median", "Zero"], key="fill_strat")
             
-            if st.button("Apply Fill Strategy", use_container_width=True):
-                if fill_strat == "Mean":
-                    st.session_state.df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
-                elif fill_strat == "Median":
-                    st.session_state.df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
-                elif fill_strat == "Zero":
-                    st.session_state.df[numeric_cols] = df[numeric_cols].fillna(0)
-                st.rerun()
+            st.button("Apply Fill Strategy", use_container_width=True, on_click=_apply_fill, args=(numeric_cols,))
 
             st.markdown("<br>", unsafe_allow_html=True)
             
-            if st.button("⚠️ Reset to Original Data", use_container_width=True):
-                st.session_state.df = st.session_state.raw_df.copy()
-                st.rerun()
+            st.button("⚠️ Reset to Original Data", use_container_width=True, on_click=_reset_data)
+
+            # A saved cleaning is only ever applied on request, never swapped in on upload
+            if st.session_state.restore_offer:
+                st.info("A cleaned version of this file was saved in an earlier session.")
+                st.button("♻️ Restore Previous Cleaning", use_container_width=True, on_click=_restore_previous)
 
         with col_preview:
             st.subheader("Live Data Preview")
-            st.dataframe(df.head(15), use_container_width=True)
+            # A scrollable grid over the first rows; st.dataframe ships every row it gets to the browser
+            st.dataframe(df.head(PREVIEW_ROWS), height=450, use_container_width=True)
+            if len(df) > PREVIEW_ROWS:
+                st.caption(f"Showing the first {PREVIEW_ROWS:,} of {len(df):,} rows.")
             
             csv_data = convert_df_to_csv(st.session_state.df)
+            is_gzip = len(st.session_state.df) > CSV_GZIP_ROWS
             st.download_button(
                 label="📥 Download Cleaned Dataset (CSV)",
                 data=csv_data,
-                file_name=f"cleaned_{st.session_state.current_file.split('.')[0]}.csv",
-                mime="text/csv",
+                file_name=f"cleaned_{st.session_state.current_file.split('.')[0]}.csv" + (".gz" if is_gzip else ""),
+                mime="application/gzip" if is_gzip else "text/csv",
                 use_container_width=True
             )
     else:
@@ -207,51 +609,19 @@ elif page == "2. Visualize":
     st.header("📈 Visual Builder")
 
     if df is not None:
-        numeric_cols = df.select_dtypes(include=["number"]).columns
-        all_cols = df.columns
+        schema = _schema(df, version)
+        numeric_cols = schema["numeric"]
+        all_cols = schema["all"]
 
-        st.write("Configure your charts here. They will automatically be added to your Final Report.")
+        st.write("Configure your charts here and press Preview. Previewed charts are added to your Final Report.")
         num_visuals = st.slider("Number of visuals to build:", 1, 9, 3)
-        chart_types = ["Histogram", "Bar", "Pie", "Line", "Scatter", "Boxplot"]
 
-        st.session_state.visual_config = []
+        # Each row writes its own slot on Preview; keep earlier previews when the slider changes
+        visual_config = st.session_state.visual_config[:num_visuals]
+        st.session_state.visual_config = visual_config + [None] * (num_visuals - len(visual_config))
 
         for i in range(num_visuals):
-            col1, col2, col3 = st.columns([1, 1, 2])
-            
-            with col1:
-                chart = st.selectbox("Chart Type", chart_types, key=f"type_{i}")
-            with col2:
-                column = st.selectbox("Target Column", all_cols, key=f"col_{i}")
-            
-            st.session_state.visual_config.append((chart, column))
-
-            with col3:
-                fig, ax = plt.subplots(figsize=(5, 1.5))
-                try:
-                    if chart == "Histogram" and column in numeric_cols:
-                        ax.hist(df[column].dropna(), bins=20, color='#0284c7', edgecolor='white')
-                    elif chart == "Bar":
-                        vc = df[column].value_counts().head(8)
-                        ax.bar(vc.index.astype(str), vc.values, color='#0284c7')
-                    elif chart == "Pie":
-                        vc = df[column].value_counts().head(5)
-                        ax.pie(vc.values, labels=vc.index.astype(str), autopct="%1.0f%%")
-                    elif chart == "Line" and column in numeric_cols:
-                        ax.plot(df[column].dropna(), color='#0284c7')
-                    elif chart == "Scatter" and column in numeric_cols:
-                        ax.scatter(range(len(df[column])), df[column].dropna(), color='#0284c7', alpha=0.5)
-                    elif chart == "Boxplot" and column in numeric_cols:
-                        ax.boxplot(df[column].dropna(), vert=False)
-                    else:
-                        st.write("⚠️ *Select a numeric column for this chart type.*")
-                        
-                    st.pyplot(fig)
-                except Exception as e:
-                    st.error("Cannot render preview.")
-                finally:
-                    plt.close(fig) 
-            st.divider()
+            _visual_row(i, df, version, all_cols, numeric_cols)
     else:
         st.info("👈 Please upload a dataset in the sidebar to begin.")
 
@@ -263,66 +633,52 @@ elif page == "3. Final Report":
 
     if df is not None:
         
+        schema = _schema(df, version)
+
+        numeric_cols = schema["numeric"]
+        stats = _report_stats(df, version, numeric_cols)
+
         # --- 1. KPI CARDS ---
         st.subheader("Key Performance Indicators")
         c1, c2, c3, c4 = st.columns(4)
         c1.markdown(f"<div class='kpi-card'><h2>{df.shape[0]:,}</h2><p>Total Rows</p></div>", unsafe_allow_html=True)
         c2.markdown(f"<div class='kpi-card'><h2>{df.shape[1]:,}</h2><p>Total Columns</p></div>", unsafe_allow_html=True)
-        c3.markdown(f"<div class='kpi-card'><h2>{df.duplicated().sum():,}</h2><p>Duplicate Rows</p></div>", unsafe_allow_html=True)
-        c4.markdown(f"<div class='kpi-card'><h2>{df.isnull().sum().sum():,}</h2><p>Missing Values</p></div>", unsafe_allow_html=True)
+        c3.markdown(f"<div class='kpi-card'><h2>{stats['dup']:,}</h2><p>Duplicate Rows</p></div>", unsafe_allow_html=True)
+        c4.markdown(f"<div class='kpi-card'><h2>{stats['nulls']:,}</h2><p>Missing Values</p></div>", unsafe_allow_html=True)
         
         st.markdown("<br><hr><br>", unsafe_allow_html=True)
 
         # --- 2. POWER BI STYLE VISUAL GRID (3 per row) ---
         st.subheader("Visual Analytics")
-        numeric_cols = df.select_dtypes(include=["number"]).columns
 
-        if st.session_state.visual_config:
-            visuals = st.session_state.visual_config
+        visuals = [v for v in st.session_state.visual_config if v is not None]
+        if visuals:
+            panels = []
+            for chart, column in visuals:
+                try:
+                    spec = _build_chart(df, version, chart, column, numeric_cols, '#10b981', 220)
+                except Exception:
+                    st.error(f"Cannot render {chart} for {column}.")
+                    continue
+                if spec is not None:
+                    panels.append(spec.properties(title=f"{chart}: {column}", width=260))
+
+            # The whole grid ships as one compound chart instead of one element per visual
+            if panels:
+                rows = [alt.hconcat(*panels[i:i+3]).resolve_scale(color="independent") for i in range(0, len(panels), 3)]
+                grid = alt.vconcat(*rows, spacing=40).resolve_scale(color="independent")
+                st.altair_chart(grid.configure_title(color="#334155", fontSize=15), use_container_width=False)
             
-            for i in range(0, len(visuals), 3):
-                cols = st.columns(3)
-                
-                for idx, (chart, column) in enumerate(visuals[i:i+3]):
-                    with cols[idx]:
-                        st.markdown(f"<h5 style='text-align:center; color:#334155;'>{chart}: {column}</h5>", unsafe_allow_html=True)
-                        
-                        fig, ax = plt.subplots(figsize=(4, 3))
-                        try:
-                            if chart == "Histogram" and column in numeric_cols:
-                                ax.hist(df[column].dropna(), bins=20, color='#10b981', edgecolor='white')
-                            elif chart == "Bar":
-                                vc = df[column].value_counts().head(8)
-                                ax.bar(vc.index.astype(str), vc.values, color='#10b981')
-                                plt.xticks(rotation=45)
-                            elif chart == "Pie":
-                                vc = df[column].value_counts().head(5)
-                                ax.pie(vc.values, labels=vc.index.astype(str), autopct="%1.0f%%")
-                            elif chart == "Line" and column in numeric_cols:
-                                ax.plot(df[column].dropna(), color='#10b981')
-                            elif chart == "Scatter" and column in numeric_cols:
-                                ax.scatter(range(len(df[column])), df[column].dropna(), color='#10b981', alpha=0.5)
-                            elif chart == "Boxplot" and column in numeric_cols:
-                                ax.boxplot(df[column].dropna(), vert=False)
-                            
-                            plt.tight_layout()
-                            st.pyplot(fig)
-                        except Exception:
-                            st.error(f"Cannot render {chart} for {column}.")
-                        finally:
-                            plt.close(fig)
-                
-                st.markdown("<br>", unsafe_allow_html=True) 
+            st.markdown("<br>", unsafe_allow_html=True) 
         else:
-            st.info("Go to the 'Visualize' tab to build charts for your dashboard.")
+            st.info("Go to the 'Visualize' tab and preview charts to add them to your dashboard.")
             
         st.markdown("<hr><br>", unsafe_allow_html=True)
         
         # --- 3. STATISTICAL SUMMARY ---
         st.subheader("Statistical Summary")
-        if len(numeric_cols) > 0:
-            summary_df = df[numeric_cols].describe().T[['mean', 'min', 'max', 'std']]
-            st.dataframe(summary_df.round(2), use_container_width=True)
+        if stats["summary"] is not None:
+            st.dataframe(stats["summary"], use_container_width=True)
         else:
             st.write("No numeric columns available for statistical summary.")
 